@@ -1,16 +1,19 @@
 from io import BytesIO
 
 from .data_stream import RecordBuilder
-from .records import Channel, Message, MessageIndex, Schema
+from .records import Channel, Message, MessageIndex, Schema, write_record
 from ._typing import Dict
 
+# room for the record that pushes a chunk past chunk_size
+_CHUNK_SLACK = 4096
+
 
 class ChunkBuilder:
-    def __init__(self) -> None:
+    def __init__(self, chunk_size: int = 1024 * 1024) -> None:
         self.message_end_time = 0
         self.message_indices: Dict[int, MessageIndex] = {}
         self.message_start_time = 0
-        self.record_writer = RecordBuilder()
+        self.record_writer = RecordBuilder(size_hint=chunk_size + _CHUNK_SLACK)
         self.num_messages = 0
 
     @property
@@ -21,10 +24,10 @@ class ChunkBuilder:
         return self.record_writer.end()
 
     def add_channel(self, channel: Channel):
-        channel.write(self.record_writer)
+        write_record(channel, self.record_writer)
 
     def add_schema(self, schema: Schema):
-        schema.write(self.record_writer)
+        write_record(schema, self.record_writer)
 
     def add_message(self, message: Message):
         if self.num_messages == 0:
@@ -35,14 +38,14 @@ class ChunkBuilder:
 
         if not self.message_indices.get(message.channel_id):
             self.message_indices[message.channel_id] = MessageIndex(
-                channel_id=message.channel_id, records=[]
+                channel_id=message.channel_id
             )
-        self.message_indices[message.channel_id].records.append(
-            (message.log_time, self.record_writer.count)
+        self.message_indices[message.channel_id].add(
+            message.log_time, self.record_writer.count
         )
 
         self.num_messages += 1
-        message.write(self.record_writer)
+        write_record(message, self.record_writer)
 
     def reset(self):
         self.message_end_time = 0
@@ -0,0 +1,61 @@
+# Copies of the writer hot paths compiled by MicroPython's native emitter.
+# records.py swaps them in when this module imports, and keeps its plain
+# versions otherwise; keep the two in step.
+import micropython
+
+from .opcode import Opcode
+from .records import _CHANNEL, _MESSAGE, _pack_string_map, _prefixed
+
+
+@micropython.native
+def write(self, data: bytes):
+    n = len(data)
+    if not n:
+        return
+    self._ensure(n)
+    self._buf[self._pos:self._pos + n] = data
+    self._pos += n
+
+
+@micropython.native
+def extend(self, parts):
+    total = 0
+    for part in parts:
+        total += len(part)
+    self._ensure(total)
+    pos = self._pos
+    buf = self._buf
+    for part in parts:
+        n = len(part)
+        buf[pos:pos + n] = part
+        pos += n
+    self._pos = pos
+
+
+@micropython.native
+def write_channel(rec, stream):
+    topic = rec._topic_bytes
+    if topic is None:
+        topic = rec._topic_bytes = _prefixed(rec.topic)
+    message_encoding = rec._message_encoding_bytes
+    if message_encoding is None:
+        message_encoding = rec._message_encoding_bytes = _prefixed(
+            rec.message_encoding)
+    metadata = _pack_string_map(rec.metadata)
+    stream.extend((
+        _CHANNEL(Opcode.CHANNEL,
+                 4 + len(topic) + len(message_encoding) + len(metadata),
+                 rec.id, rec.schema_id),
+        topic,
+        message_encoding,
+        metadata,
+    ))
+
+
+@micropython.native
+def write_message(rec, stream):
+    stream.writev((
+        _MESSAGE(Opcode.MESSAGE, 22 + len(rec.data), rec.channel_id,
+                 rec.sequence, rec.log_time, rec.publish_time),
+        rec.data,
+    ))
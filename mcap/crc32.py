@@ -1,10 +1,34 @@
-def crc32(data: bytes, value: int = 0):
-    crc = value ^ 0xFFFFFFFF
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 1:
-                crc = (crc >> 1) ^ 0xEDB88320
-            else:
-                crc >>= 1
-    return crc ^ 0xFFFFFFFF
+# CPython's zlib.crc32 only releases the GIL for inputs over 5 KiB, so small
+# records pay nothing for it. MicroPython ports expose crc32 through binascii
+# (when MICROPY_PY_BINASCII_CRC32 is enabled) rather than zlib.
+try:
+    from zlib import crc32
+except ImportError:
+    try:
+        from binascii import crc32
+    except ImportError:
+        crc32 = None
+
+if crc32 is None:
+    from array import array
+
+    def _make_table():
+        table = array("I", [0] * 256)
+        for i in range(256):
+            crc = i
+            for _ in range(8):
+                if crc & 1:
+                    crc = (crc >> 1) ^ 0xEDB88320
+                else:
+                    crc >>= 1
+            table[i] = crc
+        return table
+
+    _TABLE = _make_table()
+
+    def crc32(data: bytes, value: int = 0):
+        table = _TABLE
+        crc = value ^ 0xFFFFFFFF
+        for byte in data:
+            crc = table[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+        return crc ^ 0xFFFFFFFF
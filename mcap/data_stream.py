@@ -1,48 +1,152 @@
 import struct
-from io import BytesIO
+
+
+def _packer(fmt: str):
+    # MicroPython's struct module has no Struct type, so fall back to binding
+    # the format string to struct.pack there.
+    try:
+        return struct.Struct(fmt).pack
+    except AttributeError:
+        return lambda *values: struct.pack(fmt, *values)
+
+
+def _packer_into(fmt: str):
+    try:
+        return struct.Struct(fmt).pack_into
+    except AttributeError:
+        return lambda buffer, offset, *values: struct.pack_into(
+            fmt, buffer, offset, *values
+        )
+
+
+_S1 = _packer("<B")
+_S2 = _packer("<H")
+_S4 = _packer("<I")
+_S8 = _packer("<Q")
+_SHDR = _packer("<BQ")
+_SHDR_INTO = _packer_into("<Q")
+
+# initial buffer size, and the smallest limit on what end() keeps for reuse
+_INITIAL_CAPACITY = 4096
+_RETAINED_CAPACITY = 64 * 1024
+
+# parts at least this large bypass the buffer when a sink is bound
+_PASSTHROUGH_SIZE = 4096
 
 
 class RecordBuilder:
-    def __init__(self):
-        self._buffer = BytesIO()
+    def __init__(self, size_hint: int = 0):
+        # Capacity doubles as the buffer fills, but never past size_hint, so a
+        # builder that is flushed at a known size is not grown to the next
+        # power of two. Writes that need more still get it.
+        self._size_hint = size_hint
+        # end() keeps buffers up to twice the hint, which covers the record
+        # that pushes a chunk past its size, and drops larger one-offs such as
+        # a big attachment
+        self._retain = max(2 * size_hint, _RETAINED_CAPACITY)
+        self._buf = bytearray(_INITIAL_CAPACITY)
+        self._pos = 0
+        self._passed = 0
+        self._sink = None
 
     @property
     def count(self) -> int:
-        return self._buffer.tell()
+        return self._passed + self._pos
+
+    def bind_to(self, sink):
+        # Let writev() hand large parts straight to sink. Bytes sent this
+        # way still count towards count, but are not returned by end().
+        self._sink = sink
+
+    def _grow(self, capacity: int):
+        # Copy into a fresh buffer rather than resizing in place: a view
+        # returned by end() may still be alive, and CPython refuses to resize
+        # a bytearray that has exported its buffer.
+        buf = bytearray(capacity)
+        buf[:self._pos] = memoryview(self._buf)[:self._pos]
+        self._buf = buf
+
+    def _ensure(self, n: int):
+        size = len(self._buf)
+        needed = self._pos + n
+        if needed > size:
+            capacity = 2 * size
+            if self._size_hint and capacity > self._size_hint:
+                capacity = self._size_hint
+            self._grow(max(capacity, needed))
 
     def start_record(self, opcode: int):
-        self._record_start_offset = self._buffer.tell()
-        self._buffer.write(struct.pack("<BQ", opcode, 0))  # placeholder size
+        self._record_start = self._pos
+        self.write(_SHDR(opcode, 0))  # placeholder size
 
     def finish_record(self):
-        pos = self._buffer.tell()
-        length = pos - self._record_start_offset - 9
-        self._buffer.seek(self._record_start_offset + 1)
-        self._buffer.write(struct.pack("<Q", length))
-        self._buffer.seek(pos)
+        length = self._pos - self._record_start - 9
+        _SHDR_INTO(self._buf, self._record_start + 1, length)
 
     def end(self):
-        buf = self._buffer.getvalue()
-        self._buffer.close()
-        self._buffer = BytesIO()
-        return buf
+        # Returns a view of the internal buffer instead of a copy. It is only
+        # valid until the next write to this builder, so anything that may
+        # keep it, such as a caller's output stream, should get bytes(view).
+        view = memoryview(self._buf)[:self._pos]
+        if len(self._buf) > self._retain:
+            # release the memory used by a one-off large batch, such as an
+            # attachment, instead of holding it for the rest of the session
+            self._buf = bytearray(_INITIAL_CAPACITY)
+        self._pos = 0
+        self._passed = 0
+        return view
 
     def write(self, data: bytes):
-        self._buffer.write(data)
+        n = len(data)
+        if not n:
+            return
+        self._ensure(n)
+        self._buf[self._pos:self._pos + n] = data
+        self._pos += n
+
+    def extend(self, parts):
+        # like write() for each part, but with a single capacity check
+        total = 0
+        for part in parts:
+            total += len(part)
+        self._ensure(total)
+        pos = self._pos
+        buf = self._buf
+        for part in parts:
+            n = len(part)
+            buf[pos:pos + n] = part
+            pos += n
+        self._pos = pos
+
+    def writev(self, parts):
+        sink = self._sink
+        if sink is None:
+            self.extend(parts)
+            return
+        for part in parts:
+            if len(part) < _PASSTHROUGH_SIZE:
+                self.write(part)
+                continue
+            # flush what is buffered first so the sink sees bytes in order
+            if self._pos:
+                sink.write(bytes(memoryview(self._buf)[:self._pos]))
+                self._passed += self._pos
+                self._pos = 0
+            sink.write(part)
+            self._passed += len(part)
 
     def write_prefixed_string(self, value: str):
-        bytes = value.encode()
-        self.write4(len(bytes))
-        self.write(bytes)
+        encoded = value.encode()
+        self.write(_S4(len(encoded)) + encoded)
 
     def write1(self, value: int):
-        self.write(struct.pack("<B", value))
+        self.write(_S1(value))
 
     def write2(self, value: int):
-        self.write(struct.pack("<H", value))
+        self.write(_S2(value))
 
     def write4(self, value: int):
-        self.write(struct.pack("<I", value))
+        self.write(_S4(value))
 
     def write8(self, value: int):
-        self.write(struct.pack("<Q", value))
+        self.write(_S8(value))
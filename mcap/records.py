@@ -1,15 +1,68 @@
+import struct
+import sys
+from array import array
+
 from .crc32 import crc32
-from .data_stream import RecordBuilder
+from .data_stream import RecordBuilder, _S4, _S8, _SHDR, _packer
 from .opcode import Opcode
 from ._typing import Dict, List, Tuple
 
+# Packers for the fixed-size fields of each record. Most also lead with the
+# record's opcode and length; _ATTACHMENT does not, because its fields are
+# checksummed separately from the header.
+_ATTACHMENT = _packer("<QQ")
+_ATTACHMENT_INDEX = _packer("<BQQQQQQ")
+_CHANNEL = _packer("<BQHH")
+_CHUNK = _packer("<BQQQQI")
+_CHUNK_INDEX = _packer("<BQQQQQ")
+_CHUNK_INDEX_SIZES = _packer("<QQ")
+_DATA_END = _packer("<BQI")
+_FOOTER = _packer("<BQQQI")
+_ID_VALUE = _packer("<HQ")
+_MESSAGE = _packer("<BQHIQQ")
+_MESSAGE_INDEX = _packer("<BQHI")
+_METADATA_INDEX = _packer("<BQQQ")
+_SCHEMA = _packer("<BQH")
+_STATISTICS = _packer("<BQQHIIIIQQ")
+_SUMMARY_OFFSET = _packer("<BQBQQ")
+
+
+def _prefixed(value: str) -> bytes:
+    encoded = value.encode()
+    return _S4(len(encoded)) + encoded
+
+
+def _pack_id_map(values: Dict[int, int]) -> bytes:
+    # uint16 key / uint64 value pairs with a uint32 byte length prefix
+    blob = b"".join([_ID_VALUE(k, v) for k, v in values.items()])
+    return _S4(len(blob)) + blob
+
+
+def _pack_string_map(values: Dict[str, str]) -> bytes:
+    # prefixed key / prefixed value pairs with a uint32 byte length prefix
+    parts = []
+    for k, v in values.items():
+        kb = k.encode()
+        vb = v.encode()
+        parts.append(_S4(len(kb)))
+        parts.append(kb)
+        parts.append(_S4(len(vb)))
+        parts.append(vb)
+    blob = b"".join(parts)
+    return _S4(len(blob)) + blob
+
 
 class McapRecord:
+    __slots__ = ()
+
     def write(self, stream: RecordBuilder) -> None:
-        raise NotImplementedError()
+        write_record(self, stream)
 
 
 class Attachment(McapRecord):
+    __slots__ = ("create_time", "log_time", "name", "media_type", "data")
+    _opcode = Opcode.ATTACHMENT
+
     def __init__(self, create_time: int, log_time: int, name: str,
                  media_type: str, data: bytes):
         self.create_time = create_time
@@ -18,23 +71,32 @@ class Attachment(McapRecord):
         self.media_type = media_type
         self.data = data
 
-    def write(self, stream: RecordBuilder):
-        builder = RecordBuilder()
-        builder.start_record(Opcode.ATTACHMENT)
-        builder.write8(self.log_time)
-        builder.write8(self.create_time)
-        builder.write_prefixed_string(self.name)
-        builder.write_prefixed_string(self.media_type)
-        builder.write8(len(self.data))
-        builder.write(self.data)
-        builder.write4(0)  # crc
-        builder.finish_record()
-        data = memoryview(builder.end())
-        stream.write(data[:-4])
-        stream.write4(crc32(data[9:-4]))
+
+def _write_attachment(rec: Attachment, stream: RecordBuilder):
+    fields = b"".join((
+        _ATTACHMENT(rec.log_time, rec.create_time),
+        _prefixed(rec.name),
+        _prefixed(rec.media_type),
+        _S8(len(rec.data)),
+    ))
+    # the crc covers every field that precedes it, so accumulate it over
+    # the same pieces that are written rather than re-reading them
+    crc = crc32(rec.data, crc32(fields))
+    stream.extend((
+        _SHDR(Opcode.ATTACHMENT, len(fields) + len(rec.data) + 4),
+        fields,
+        rec.data,
+        _S4(crc),
+    ))
 
 
 class AttachmentIndex(McapRecord):
+    __slots__ = (
+        "offset", "length", "log_time", "create_time", "data_size", "name",
+        "media_type",
+    )
+    _opcode = Opcode.ATTACHMENT_INDEX
+
     def __init__(self, offset: int, length: int, log_time: int,
                  create_time: int, data_size: int, name: str, media_type: str):
         self.offset = offset
@@ -45,19 +107,27 @@ class AttachmentIndex(McapRecord):
         self.name = name
         self.media_type = media_type
 
-    def write(self, stream: RecordBuilder):
-        stream.start_record(Opcode.ATTACHMENT_INDEX)
-        stream.write8(self.offset)
-        stream.write8(self.length)
-        stream.write8(self.log_time)
-        stream.write8(self.create_time)
-        stream.write8(self.data_size)
-        stream.write_prefixed_string(self.name)
-        stream.write_prefixed_string(self.media_type)
-        stream.finish_record()
+
+def _write_attachment_index(rec: AttachmentIndex, stream: RecordBuilder):
+    name = _prefixed(rec.name)
+    media_type = _prefixed(rec.media_type)
+    stream.extend((
+        _ATTACHMENT_INDEX(Opcode.ATTACHMENT_INDEX,
+                          40 + len(name) + len(media_type), rec.offset,
+                          rec.length, rec.log_time, rec.create_time,
+                          rec.data_size),
+        name,
+        media_type,
+    ))
 
 
 class Channel(McapRecord):
+    __slots__ = (
+        "id", "topic", "message_encoding", "metadata", "schema_id",
+        "_topic_bytes", "_message_encoding_bytes",
+    )
+    _opcode = Opcode.CHANNEL
+
     def __init__(self, id: int, topic: str, message_encoding: str,
                  metadata: Dict[str, str], schema_id: int):
         self.id = id
@@ -65,26 +135,38 @@ class Channel(McapRecord):
         self.message_encoding = message_encoding
         self.metadata = metadata
         self.schema_id = schema_id
-
-    def write(self, stream: RecordBuilder):
-        stream.start_record(Opcode.CHANNEL)
-        stream.write2(self.id)
-        stream.write2(self.schema_id)
-        stream.write_prefixed_string(self.topic)
-        stream.write_prefixed_string(self.message_encoding)
-        meta_length = 0
-        for k, v in self.metadata.items():
-            meta_length += 8
-            meta_length += len(k.encode())
-            meta_length += len(v.encode())
-        stream.write4(meta_length)
-        for k, v in self.metadata.items():
-            stream.write_prefixed_string(k)
-            stream.write_prefixed_string(v)
-        stream.finish_record()
+        # prefixed encodings, filled in on first write; channels are written
+        # again in the summary section
+        self._topic_bytes = None
+        self._message_encoding_bytes = None
+
+
+def _write_channel(rec: Channel, stream: RecordBuilder):
+    topic = rec._topic_bytes
+    if topic is None:
+        topic = rec._topic_bytes = _prefixed(rec.topic)
+    message_encoding = rec._message_encoding_bytes
+    if message_encoding is None:
+        message_encoding = rec._message_encoding_bytes = _prefixed(
+            rec.message_encoding)
+    metadata = _pack_string_map(rec.metadata)
+    stream.extend((
+        _CHANNEL(Opcode.CHANNEL,
+                 4 + len(topic) + len(message_encoding) + len(metadata),
+                 rec.id, rec.schema_id),
+        topic,
+        message_encoding,
+        metadata,
+    ))
 
 
 class Chunk(McapRecord):
+    __slots__ = (
+        "compression", "data", "message_end_time", "message_start_time",
+        "uncompressed_crc", "uncompressed_size",
+    )
+    _opcode = Opcode.CHUNK
+
     def __init__(self, compression: str, data: bytes, message_end_time: int,
                 message_start_time: int, uncompressed_crc: int,
                 uncompressed_size: int):
@@ -95,19 +177,27 @@ class Chunk(McapRecord):
         self.uncompressed_crc = uncompressed_crc
         self.uncompressed_size = uncompressed_size
 
-    def write(self, stream: RecordBuilder):
-        stream.start_record(Opcode.CHUNK)
-        stream.write8(self.message_start_time)
-        stream.write8(self.message_end_time)
-        stream.write8(self.uncompressed_size)
-        stream.write4(self.uncompressed_crc)
-        stream.write_prefixed_string(self.compression)
-        stream.write8(len(self.data))
-        stream.write(self.data)
-        stream.finish_record()
+
+def _write_chunk(rec: Chunk, stream: RecordBuilder):
+    compression = _prefixed(rec.compression)
+    stream.extend((
+        _CHUNK(Opcode.CHUNK, 36 + len(compression) + len(rec.data),
+               rec.message_start_time, rec.message_end_time,
+               rec.uncompressed_size, rec.uncompressed_crc),
+        compression,
+        _S8(len(rec.data)),
+        rec.data,
+    ))
 
 
 class ChunkIndex(McapRecord):
+    __slots__ = (
+        "chunk_length", "chunk_start_offset", "compression", "compressed_size",
+        "message_end_time", "message_index_length", "message_index_offsets",
+        "message_start_time", "uncompressed_size",
+    )
+    _opcode = Opcode.CHUNK_INDEX
+
     def __init__(self, chunk_length: int, chunk_start_offset: int,
                  compression: str, compressed_size: int,
                  message_end_time: int, message_index_length: int,
@@ -123,61 +213,73 @@ class ChunkIndex(McapRecord):
         self.message_start_time = message_start_time
         self.uncompressed_size = uncompressed_size
 
-    def write(self, stream: RecordBuilder):
-        stream.start_record(Opcode.CHUNK_INDEX)
-        stream.write8(self.message_start_time)
-        stream.write8(self.message_end_time)
-        stream.write8(self.chunk_start_offset)
-        stream.write8(self.chunk_length)
-        stream.write4(len(self.message_index_offsets) * 10)
-        for id, offset in self.message_index_offsets.items():
-            stream.write2(id)
-            stream.write8(offset)
-        stream.write8(self.message_index_length)
-        stream.write_prefixed_string(self.compression)
-        stream.write8(self.compressed_size)
-        stream.write8(self.uncompressed_size)
-        stream.finish_record()
+
+def _write_chunk_index(rec: ChunkIndex, stream: RecordBuilder):
+    message_index_offsets = _pack_id_map(rec.message_index_offsets)
+    compression = _prefixed(rec.compression)
+    stream.extend((
+        _CHUNK_INDEX(Opcode.CHUNK_INDEX,
+                     56 + len(message_index_offsets) + len(compression),
+                     rec.message_start_time, rec.message_end_time,
+                     rec.chunk_start_offset, rec.chunk_length),
+        message_index_offsets,
+        _S8(rec.message_index_length),
+        compression,
+        _CHUNK_INDEX_SIZES(rec.compressed_size, rec.uncompressed_size),
+    ))
 
 
 class DataEnd(McapRecord):
+    __slots__ = ("data_section_crc",)
+    _opcode = Opcode.DATA_END
+
     def __init__(self, data_section_crc: int):
         self.data_section_crc = data_section_crc
 
-    def write(self, stream: RecordBuilder):
-        stream.start_record(Opcode.DATA_END)
-        stream.write4(self.data_section_crc)
-        stream.finish_record()
+
+def _write_data_end(rec: DataEnd, stream: RecordBuilder):
+    stream.write(_DATA_END(Opcode.DATA_END, 4, rec.data_section_crc))
 
 
 class Footer(McapRecord):
+    __slots__ = ("summary_start", "summary_offset_start", "summary_crc")
+    _opcode = Opcode.FOOTER
+
     def __init__(self, summary_start: int, summary_offset_start: int,
                  summary_crc: int):
         self.summary_start = summary_start
         self.summary_offset_start = summary_offset_start
         self.summary_crc = summary_crc
 
-    def write(self, stream: RecordBuilder):
-        stream.start_record(Opcode.FOOTER)
-        stream.write8(self.summary_start)
-        stream.write8(self.summary_offset_start)
-        stream.write4(self.summary_crc)
-        stream.finish_record()
+
+def _write_footer(rec: Footer, stream: RecordBuilder):
+    stream.write(_FOOTER(Opcode.FOOTER, 20, rec.summary_start,
+                         rec.summary_offset_start, rec.summary_crc))
 
 
 class Header(McapRecord):
+    __slots__ = ("profile", "library")
+    _opcode = Opcode.HEADER
+
     def __init__(self, profile: str, library: str):
         self.profile = profile
         self.library = library
 
-    def write(self, stream: RecordBuilder):
-        stream.start_record(Opcode.HEADER)
-        stream.write_prefixed_string(self.profile)
-        stream.write_prefixed_string(self.library)
-        stream.finish_record()
+
+def _write_header(rec: Header, stream: RecordBuilder):
+    profile = _prefixed(rec.profile)
+    library = _prefixed(rec.library)
+    stream.extend((
+        _SHDR(Opcode.HEADER, len(profile) + len(library)),
+        profile,
+        library,
+    ))
 
 
 class Message(McapRecord):
+    __slots__ = ("channel_id", "log_time", "data", "publish_time", "sequence")
+    _opcode = Opcode.MESSAGE
+
     def __init__(self, channel_id: int, log_time: int, data: bytes,
                  publish_time: int, sequence: int):
         self.channel_id = channel_id
@@ -186,83 +288,131 @@ class Message(McapRecord):
         self.publish_time = publish_time
         self.sequence = sequence
 
-    def write(self, stream: RecordBuilder):
-        stream.start_record(Opcode.MESSAGE)
-        stream.write2(self.channel_id)
-        stream.write4(self.sequence)
-        stream.write8(self.log_time)
-        stream.write8(self.publish_time)
-        stream.write(self.data)
-        stream.finish_record()
+
+def _write_message(rec: Message, stream: RecordBuilder):
+    stream.writev((
+        _MESSAGE(Opcode.MESSAGE, 22 + len(rec.data), rec.channel_id,
+                 rec.sequence, rec.log_time, rec.publish_time),
+        rec.data,
+    ))
 
 
 class MessageIndex(McapRecord):
-    def __init__(self, channel_id: int, records: List[Tuple[int, int]]):
-        self.channel_id = channel_id
-        self.records = records
+    __slots__ = ("channel_id", "_entries")
+    _opcode = Opcode.MESSAGE_INDEX
 
-    def write(self, stream: RecordBuilder):
-        stream.start_record(Opcode.MESSAGE_INDEX)
-        stream.write2(self.channel_id)
-        stream.write4(len(self.records) * 16)
-        for timestamp, offset in self.records:
-            stream.write8(timestamp)
-            stream.write8(offset)
-        stream.finish_record()
+    def __init__(self, channel_id: int, records: List[Tuple[int, int]] = (),
+                 timestamps: array = None, offsets: array = None):
+        self.channel_id = channel_id
+        # timestamp, offset pairs stored interleaved, in the on-disk order,
+        # rather than as one tuple object per message
+        self._entries = array("Q")
+        for timestamp, offset in records:
+            self.add(timestamp, offset)
+        if timestamps is not None or offsets is not None:
+            if timestamps is None or offsets is None:
+                raise ValueError(
+                    "timestamps and offsets must be given together")
+            if len(timestamps) != len(offsets):
+                raise ValueError("timestamps and offsets differ in length")
+            for timestamp, offset in zip(timestamps, offsets):
+                self.add(timestamp, offset)
+
+    def add(self, timestamp: int, offset: int):
+        self._entries.append(timestamp)
+        self._entries.append(offset)
+
+    @property
+    def records(self) -> Tuple[Tuple[int, int], ...]:
+        # a read-only snapshot, so stale records.append() callers fail loudly;
+        # use add() to append entries
+        e = self._entries
+        return tuple((e[i], e[i + 1]) for i in range(0, len(e), 2))
+
+
+def _write_message_index(rec: MessageIndex, stream: RecordBuilder):
+    entries = rec._entries
+    if sys.byteorder == "little":
+        entries = bytes(entries)
+    else:
+        entries = struct.pack("<%dQ" % len(entries), *entries)
+    stream.extend((
+        _MESSAGE_INDEX(Opcode.MESSAGE_INDEX, 6 + len(entries), rec.channel_id,
+                       len(entries)),
+        entries,
+    ))
 
 
 class Metadata(McapRecord):
+    __slots__ = ("name", "metadata")
+    _opcode = Opcode.METADATA
+
     def __init__(self, name: str, metadata: Dict[str, str]):
         self.name = name
         self.metadata = metadata
 
-    def write(self, stream: RecordBuilder) -> None:
-        stream.start_record(Opcode.METADATA)
-        stream.write_prefixed_string(self.name)
-        meta_length = 0
-        for k, v in self.metadata.items():
-            meta_length += 8
-            meta_length += len(k.encode())
-            meta_length += len(v.encode())
-        stream.write4(meta_length)
-        for k, v in self.metadata.items():
-            stream.write_prefixed_string(k)
-            stream.write_prefixed_string(v)
-        stream.finish_record()
+
+def _write_metadata(rec: Metadata, stream: RecordBuilder):
+    name = _prefixed(rec.name)
+    metadata = _pack_string_map(rec.metadata)
+    stream.extend((
+        _SHDR(Opcode.METADATA, len(name) + len(metadata)),
+        name,
+        metadata,
+    ))
 
 
 class MetadataIndex(McapRecord):
+    __slots__ = ("offset", "length", "name")
+    _opcode = Opcode.METADATA_INDEX
+
     def __init__(self, offset: int, length: int, name: str):
         self.offset = offset
         self.length = length
         self.name = name
 
-    def write(self, stream: RecordBuilder) -> None:
-        stream.start_record(Opcode.METADATA_INDEX)
-        stream.write8(self.offset)
-        stream.write8(self.length)
-        stream.write_prefixed_string(self.name)
-        stream.finish_record()
+
+def _write_metadata_index(rec: MetadataIndex, stream: RecordBuilder):
+    name = _prefixed(rec.name)
+    stream.extend((
+        _METADATA_INDEX(Opcode.METADATA_INDEX, 16 + len(name), rec.offset,
+                        rec.length),
+        name,
+    ))
 
 
 class Schema(McapRecord):
+    __slots__ = ("id", "data", "encoding", "name")
+    _opcode = Opcode.SCHEMA
+
     def __init__(self, id: int, data: bytes, encoding: str, name: str):
         self.id = id
         self.data = data
         self.encoding = encoding
         self.name = name
 
-    def write(self, stream: RecordBuilder):
-        stream.start_record(Opcode.SCHEMA)
-        stream.write2(self.id)
-        stream.write_prefixed_string(self.name)
-        stream.write_prefixed_string(self.encoding)
-        stream.write4(len(self.data))
-        stream.write(self.data)
-        stream.finish_record()
+
+def _write_schema(rec: Schema, stream: RecordBuilder):
+    name = _prefixed(rec.name)
+    encoding = _prefixed(rec.encoding)
+    stream.extend((
+        _SCHEMA(Opcode.SCHEMA, 6 + len(name) + len(encoding) + len(rec.data),
+                rec.id),
+        name,
+        encoding,
+        _S4(len(rec.data)),
+        rec.data,
+    ))
 
 
 class Statistics(McapRecord):
+    __slots__ = (
+        "attachment_count", "channel_count", "channel_message_counts",
+        "chunk_count", "message_count", "message_end_time",
+        "message_start_time", "metadata_count", "schema_count",
+    )
+    _opcode = Opcode.STATISTICS
+
     def __init__(self, attachment_count: int, channel_count: int,
                  channel_message_counts: Dict[int, int], chunk_count: int,
                  message_count: int, message_end_time: int,
@@ -278,32 +428,66 @@ class Statistics(McapRecord):
         self.metadata_count = metadata_count
         self.schema_count = schema_count
 
-    def write(self, stream: RecordBuilder):
-        stream.start_record(Opcode.STATISTICS)
-        stream.write8(self.message_count)
-        stream.write2(self.schema_count)
-        stream.write4(self.channel_count)
-        stream.write4(self.attachment_count)
-        stream.write4(self.metadata_count)
-        stream.write4(self.chunk_count)
-        stream.write8(self.message_start_time)
-        stream.write8(self.message_end_time)
-        stream.write4(len(self.channel_message_counts) * 10)
-        for id, count in self.channel_message_counts.items():
-            stream.write2(id)
-            stream.write8(count)
-        stream.finish_record()
+
+def _write_statistics(rec: Statistics, stream: RecordBuilder):
+    channel_message_counts = _pack_id_map(rec.channel_message_counts)
+    stream.extend((
+        _STATISTICS(Opcode.STATISTICS, 42 + len(channel_message_counts),
+                    rec.message_count, rec.schema_count, rec.channel_count,
+                    rec.attachment_count, rec.metadata_count,
+                    rec.chunk_count, rec.message_start_time,
+                    rec.message_end_time),
+        channel_message_counts,
+    ))
 
 
 class SummaryOffset(McapRecord):
+    __slots__ = ("group_opcode", "group_start", "group_length")
+    _opcode = Opcode.SUMMARY_OFFSET
+
     def __init__(self, group_opcode: int, group_start: int, group_length: int):
         self.group_opcode = group_opcode
         self.group_start = group_start
         self.group_length = group_length
 
-    def write(self, stream: RecordBuilder):
-        stream.start_record(Opcode.SUMMARY_OFFSET)
-        stream.write1(self.group_opcode)
-        stream.write8(self.group_start)
-        stream.write8(self.group_length)
-        stream.finish_record()
+
+def _write_summary_offset(rec: SummaryOffset, stream: RecordBuilder):
+    stream.write(_SUMMARY_OFFSET(Opcode.SUMMARY_OFFSET, 17, rec.group_opcode,
+                                 rec.group_start, rec.group_length))
+
+
+_WRITERS = {
+    Opcode.ATTACHMENT: _write_attachment,
+    Opcode.ATTACHMENT_INDEX: _write_attachment_index,
+    Opcode.CHANNEL: _write_channel,
+    Opcode.CHUNK: _write_chunk,
+    Opcode.CHUNK_INDEX: _write_chunk_index,
+    Opcode.DATA_END: _write_data_end,
+    Opcode.FOOTER: _write_footer,
+    Opcode.HEADER: _write_header,
+    Opcode.MESSAGE: _write_message,
+    Opcode.MESSAGE_INDEX: _write_message_index,
+    Opcode.METADATA: _write_metadata,
+    Opcode.METADATA_INDEX: _write_metadata_index,
+    Opcode.SCHEMA: _write_schema,
+    Opcode.STATISTICS: _write_statistics,
+    Opcode.SUMMARY_OFFSET: _write_summary_offset,
+}
+
+
+def write_record(record: McapRecord, stream: RecordBuilder) -> None:
+    _WRITERS[record._opcode](record, stream)
+
+
+# Use natively compiled copies of the hot paths where the port can build
+# them. CPython has no micropython module, and ports built without the native
+# emitter reject @micropython.native with a SyntaxError.
+try:
+    from . import _native
+except (ImportError, SyntaxError):
+    pass
+else:
+    RecordBuilder.write = _native.write
+    RecordBuilder.extend = _native.extend
+    _WRITERS[Opcode.CHANNEL] = _native.write_channel
+    _WRITERS[Opcode.MESSAGE] = _native.write_message
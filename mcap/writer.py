@@ -1,7 +1,7 @@
 import struct
 from collections import OrderedDict
 
-from ._chunk_builder import ChunkBuilder
+from ._chunk_builder import _CHUNK_SLACK, ChunkBuilder
 from .crc32 import crc32
 from .data_stream import RecordBuilder
 from .opcode import Opcode
@@ -20,6 +20,7 @@ from .records import (
     Schema,
     Statistics,
     SummaryOffset,
+    write_record,
 )
 from ._typing import IO, Any, Dict, List, Union
 from mcap import __version__
@@ -78,11 +79,19 @@ class Writer:
             self.__should_close = True
         else:
             self.__stream = output
-        self.__record_builder = RecordBuilder()
+        # when chunking, every chunk passes through this builder, so size it
+        # to keep one chunk's worth of buffer between flushes
+        self.__record_builder = RecordBuilder(
+            size_hint=chunk_size + _CHUNK_SLACK if use_chunking else 0
+        )
+        if not use_chunking and not enable_data_crcs:
+            # unchunked messages can go straight to the output, unless every
+            # byte has to pass through __flush to be checksummed
+            self.__record_builder.bind_to(self.__stream)
         self.__attachment_indexes: list[AttachmentIndex] = []
         self.__metadata_indexes: list[MetadataIndex] = []
         self.__channels: OrderedDict[int, Channel] = OrderedDict()
-        self.__chunk_builder = ChunkBuilder() if use_chunking else None
+        self.__chunk_builder = ChunkBuilder(chunk_size) if use_chunking else None
         self.__chunk_indices: List[ChunkIndex] = []
         self.__chunk_size = chunk_size
         self.__compression = compression
@@ -131,7 +140,7 @@ class Writer:
             media_type=media_type,
             data=data,
         )
-        attachment.write(self.__record_builder)
+        write_record(attachment, self.__record_builder)
         if self.__index_types & IndexType.ATTACHMENT:
             index = AttachmentIndex(
                 offset=offset,
@@ -187,7 +196,7 @@ class Writer:
             self.__chunk_builder.add_message(message)
             self.__maybe_finalize_chunk()
         else:
-            message.write(self.__record_builder)
+            write_record(message, self.__record_builder)
             self.__flush()
 
     def add_metadata(self, name: str, data: Dict[str, str]):
@@ -201,7 +210,7 @@ class Writer:
         offset = self.__stream.tell()
         self.__statistics.metadata_count += 1
         metadata = Metadata(name=name, metadata=data)
-        metadata.write(self.__record_builder)
+        write_record(metadata, self.__record_builder)
         if self.__index_types & IndexType.METADATA:
             index = MetadataIndex(
                 offset=offset, length=self.__record_builder.count, name=name
@@ -216,7 +225,7 @@ class Writer:
         """
         self.__finalize_chunk()
 
-        DataEnd(self.__data_section_crc).write(self.__record_builder)
+        write_record(DataEnd(self.__data_section_crc), self.__record_builder)
         self.__flush()
 
         summary_start = self.__stream.tell()
@@ -225,7 +234,7 @@ class Writer:
         if self.__repeat_schemas:
             group_start = summary_builder.count
             for schema in self.__schemas.values():
-                schema.write(summary_builder)
+                write_record(schema, summary_builder)
             self.__summary_offsets.append(
                 SummaryOffset(
                     group_opcode=Opcode.SCHEMA,
@@ -237,7 +246,7 @@ class Writer:
         if self.__repeat_channels:
             group_start = summary_builder.count
             for channel in self.__channels.values():
-                channel.write(summary_builder)
+                write_record(channel, summary_builder)
             self.__summary_offsets.append(
                 SummaryOffset(
                     group_opcode=Opcode.CHANNEL,
@@ -248,7 +257,7 @@ class Writer:
 
         if self.__use_statistics:
             group_start = summary_builder.count
-            self.__statistics.write(summary_builder)
+            write_record(self.__statistics, summary_builder)
             self.__summary_offsets.append(
                 SummaryOffset(
                     group_opcode=Opcode.STATISTICS,
@@ -260,7 +269,7 @@ class Writer:
         if self.__index_types & IndexType.CHUNK:
             group_start = summary_builder.count
             for index in self.__chunk_indices:
-                index.write(summary_builder)
+                write_record(index, summary_builder)
             self.__summary_offsets.append(
                 SummaryOffset(
                     group_opcode=Opcode.CHUNK_INDEX,
@@ -272,7 +281,7 @@ class Writer:
         if self.__index_types & IndexType.ATTACHMENT:
             group_start = summary_builder.count
             for index in self.__attachment_indexes:
-                index.write(summary_builder)
+                write_record(index, summary_builder)
             self.__summary_offsets.append(
                 SummaryOffset(
                     group_opcode=Opcode.ATTACHMENT_INDEX,
@@ -284,7 +293,7 @@ class Writer:
         if self.__index_types & IndexType.METADATA:
             group_start = summary_builder.count
             for index in self.__metadata_indexes:
-                index.write(summary_builder)
+                write_record(index, summary_builder)
             self.__summary_offsets.append(
                 SummaryOffset(
                     group_opcode=Opcode.METADATA_INDEX,
@@ -298,7 +307,7 @@ class Writer:
         )
         if self.__use_summary_offsets:
             for offset in self.__summary_offsets:
-                offset.write(summary_builder)
+                write_record(offset, summary_builder)
 
         summary_data = summary_builder.end()
         summary_length = len(summary_data)
@@ -319,11 +328,12 @@ class Writer:
 
         self.__stream.write(summary_data)
 
-        Footer(
+        footer = Footer(
             summary_start=0 if summary_length == 0 else summary_start,
             summary_offset_start=summary_offset_start,
             summary_crc=summary_crc,
-        ).write(self.__record_builder)
+        )
+        write_record(footer, self.__record_builder)
 
         self.__flush()
         self.__stream.write(MCAP0_MAGIC)
@@ -361,7 +371,7 @@ class Writer:
             self.__chunk_builder.add_channel(channel)
             self.__maybe_finalize_chunk()
         else:
-            channel.write(self.__record_builder)
+            write_record(channel, self.__record_builder)
         return channel_id
 
     def register_schema(self, name: str, encoding: str, data: bytes):
@@ -382,7 +392,7 @@ class Writer:
             self.__chunk_builder.add_schema(schema)
             self.__maybe_finalize_chunk()
         else:
-            schema.write(self.__record_builder)
+            write_record(schema, self.__record_builder)
         return schema_id
 
     def start(self, profile: str = "", library: str = LIBRARY_IDENTIFIER):
@@ -397,14 +407,16 @@ class Writer:
         self.__stream.write(MCAP0_MAGIC)
         if self.__enable_data_crcs:
             self.__data_section_crc = crc32(MCAP0_MAGIC, self.__data_section_crc)
-        Header(profile, library).write(self.__record_builder)
+        write_record(Header(profile, library), self.__record_builder)
         self.__flush()
 
     def __flush(self):
         data = self.__record_builder.end()
         if self.__enable_data_crcs:
             self.__data_section_crc = crc32(data, self.__data_section_crc)
-        self.__stream.write(data)
+        # data is a view of the record builder's reusable buffer; the output
+        # stream may hold on to what it is given, so hand it a copy
+        self.__stream.write(bytes(data))
 
     def __finalize_chunk(self):
         if not self.__chunk_builder:
@@ -429,7 +441,7 @@ class Writer:
 
         self.__flush()
         chunk_start_offset = self.__stream.tell()
-        chunk.write(self.__record_builder)
+        write_record(chunk, self.__record_builder)
         chunk_size = self.__record_builder.count
 
         chunk_index = ChunkIndex(
@@ -452,7 +464,7 @@ class Writer:
                 chunk_index.message_index_offsets[id] = (
                     message_index_start_offset + self.__record_builder.count
                 )
-                index.write(self.__record_builder)
+                write_record(index, self.__record_builder)
 
         chunk_index.message_index_length = self.__record_builder.count
 